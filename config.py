@@ -7,6 +7,24 @@ import os
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+
+try:
+    # Optional accelerator: C ISO 8601 parser that accepts a trailing 'Z' directly
+    from ciso8601 import parse_datetime as _ciso_parse_datetime
+except ImportError:
+    _ciso_parse_datetime = None
+
+def parse_iso_datetime(date_string: str) -> datetime:
+    """Parse an ISO 8601 timestamp such as 2025-01-01T00:00:00Z; raises ValueError if invalid"""
+    if _ciso_parse_datetime is None:
+        return datetime.fromisoformat(date_string.replace('Z', '+00:00'))
+    
+    # ciso8601 also accepts YYYY-MM, ordinal dates, a 24:00 hour and a lowercase 'z', which
+    # fromisoformat rejects; reject them here too so validity does not depend on what is installed
+    if len(date_string) < 10 or date_string[7] != '-' or date_string[11:13] == '24' or date_string.endswith('z'):
+        raise ValueError(f"Not a YYYY-MM-DD timestamp: {date_string!r}")
+    return _ciso_parse_datetime(date_string)
 
 @dataclass
 class CollectionConfig:
@@ -21,6 +39,8 @@ class CollectionConfig:
     max_workers: int = 5
     batch_size: int = 10
     timeout_seconds: int = 30
+    cache_dir: Optional[str] = None  # Defaults to CACHE_SETTINGS["directory"]
+    tokens: Optional[List[str]] = None  # Rotated per request; defaults to the single GH_TOKEN/gh CLI token
     
     def __post_init__(self):
         """Validate configuration after initialization"""
@@ -29,33 +49,33 @@ class CollectionConfig:
         
         # Validate date format
         try:
-            datetime.fromisoformat(self.since_date.replace('Z', '+00:00'))
+            parse_iso_datetime(self.since_date)
         except ValueError:
             raise ValueError("Invalid since_date format. Use ISO format like '2025-01-01T00:00:00Z'")
         
         if self.until_date:
             try:
-                datetime.fromisoformat(self.until_date.replace('Z', '+00:00'))
+                parse_iso_datetime(self.until_date)
             except ValueError:
                 raise ValueError("Invalid until_date format. Use ISO format like '2025-12-31T23:59:59Z'")
 
 
-# Default GitHub CLI command templates
-GITHUB_COMMANDS = {
-    "list_repos": ["gh", "repo", "list", "{org}", "--limit", "1000", "--json", "name"],
-    "list_branches": ["gh", "api", "/repos/{org}/{repo}/branches", "--jq", ".[].name"],
-    "get_commits": [
-        "gh", "api", "/repos/{org}/{repo}/commits",
-        "--method", "GET",
-        "-f", "sha={branch}",
-        "-f", "since={since}",
-        "-f", "per_page=100",
-        "--jq", ".[] | {message: .commit.message, author: .commit.author.name, date: .commit.author.date, sha: .sha}"
-    ],
-    "get_commit_stats": [
-        "gh", "api", "/repos/{org}/{repo}/commits/{sha}",
-        "--jq", ".stats | {additions: .additions, deletions: .deletions, total: .total}"
-    ]
+# GitHub REST/GraphQL API endpoint templates
+GITHUB_API = {
+    "host": "api.github.com",
+    "list_org_repos": "/orgs/{org}/repos",
+    "list_user_repos": "/users/{org}/repos",
+    "list_branches": "/repos/{org}/{repo}/branches",
+    "get_commits": "/repos/{org}/{repo}/commits",
+    "get_commit": "/repos/{org}/{repo}/commits/{sha}",
+    "graphql": "/graphql",
+    "per_page": 100,
+    "headers": {
+        "Accept": "application/vnd.github+json",
+        "Accept-Encoding": "gzip",
+        "X-GitHub-Api-Version": "2022-11-28",
+        "User-Agent": "gh-commit-collector"
+    }
 }
 
 # CSV field mappings
@@ -77,7 +97,18 @@ PERFORMANCE_SETTINGS = {
     "max_concurrent_branches": 5,
     "api_timeout": 30,
     "retry_attempts": 3,
-    "retry_delay": 1.0
+    "retry_delay": 1.0,  # Base delay, doubled on each retry
+    "max_rate_limit_wait": 900,  # Give up instead of waiting longer for a rate limit reset
+    "rate_limit_pacing_threshold": 500,  # Spread requests over the reset window below this many remaining
+    "stats_batch_size": 50,  # Commits per GraphQL stats query
+    "graphql_repos_per_query": 25  # Repository histories per GraphQL collection query
+}
+
+# Conditional request cache (ETags and response bodies)
+CACHE_SETTINGS = {
+    "directory": os.path.join(os.path.expanduser("~"), ".cache", "gh-commit-collector"),
+    "etag_db": "etags.sqlite",
+    "max_age_days": 30  # Cached responses older than this are dropped and fetched again
 }
 
 # Output formatting
@@ -86,7 +117,11 @@ OUTPUT_FORMATS = {
         "encoding": "utf-8",
         "newline": ""
     },
+    "parquet": {
+        "compression": "zstd"
+    },
     "console": {
+        "log_format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         "success_prefix": "✓",
         "error_prefix": "✗",
         "warning_prefix": "⚠",
@@ -94,7 +129,7 @@ OUTPUT_FORMATS = {
     }
 }
 
-def get_default_output_filename(org: str, config: CollectionConfig) -> str:
+def get_default_output_filename(org: str, config: CollectionConfig, extension: str = "csv") -> str:
     """Generate default output filename based on configuration"""
     base_name = f"{org}_commits"
     
@@ -113,19 +148,69 @@ def get_default_output_filename(org: str, config: CollectionConfig) -> str:
         author_clean = "".join(c for c in config.author_filter if c.isalnum() or c in "._-")
         base_name += f"_{author_clean}"
     
-    return f"{base_name}.csv"
+    return f"{base_name}.{extension}"
+
+def read_tokens_file(path: str) -> List[str]:
+    """Read API tokens from a file, one per line; blank lines and # comments are ignored"""
+    with open(path, encoding="utf-8") as tokens_file:
+        tokens = [line.strip() for line in tokens_file]
+    return [token for token in tokens if token and not token.startswith("#")]
 
 def validate_github_cli() -> bool:
-    """Check if GitHub CLI is installed and authenticated"""
+    """Check that a GitHub token is available from the environment or an authenticated GitHub CLI"""
+    return get_github_token() is not None
+
+@lru_cache(maxsize=None)
+def get_github_token() -> Optional[str]:
+    """Get an API token from GH_TOKEN/GITHUB_TOKEN or the authenticated GitHub CLI
+    
+    Cached so validation and the API client share a single 'gh auth token' call.
+    """
     import subprocess
     
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN") or _read_gh_hosts_token()
+    if token:
+        return token
+    
     try:
-        # Check if gh is installed
-        subprocess.run(["gh", "--version"], capture_output=True, check=True)
-        
-        # Check if authenticated
-        result = subprocess.run(["gh", "auth", "status"], capture_output=True, text=True)
-        return result.returncode == 0
+        result = subprocess.run(["gh", "auth", "token"], capture_output=True, text=True, check=True)
+        return result.stdout.strip() or None
         
     except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
\ No newline at end of file
+        return None
+
+def _read_gh_hosts_token() -> Optional[str]:
+    """Read the github.com token from the GitHub CLI's hosts.yml without spawning 'gh'
+    
+    Returns None when the file is missing or the CLI keeps its token in the system keyring.
+    """
+    config_dir = os.environ.get("GH_CONFIG_DIR") or os.path.join(
+        os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config"), "gh"
+    )
+    
+    try:
+        with open(os.path.join(config_dir, "hosts.yml"), encoding="utf-8") as hosts_file:
+            lines = hosts_file.read().splitlines()
+    except OSError:
+        return None
+    
+    # Only the top-level "github.com:" block and its direct "oauth_token:" key are needed
+    in_github_block = False
+    block_indent = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        
+        indent = len(line) - len(line.lstrip())
+        if indent == 0:
+            in_github_block = stripped == "github.com:"
+            block_indent = None
+            continue
+        
+        if in_github_block:
+            block_indent = block_indent if block_indent is not None else indent
+            if indent == block_indent and stripped.startswith("oauth_token:"):
+                return stripped.split(":", 1)[1].strip().strip("'\"") or None
+    
+    return None
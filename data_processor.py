@@ -4,65 +4,279 @@ Data processing utilities for commit data
 """
 
 import csv
+import heapq
 import logging
-from typing import List, Dict, Set, Optional
+import os
+import sys
+from typing import Callable, Iterable, List, Dict, Set, Optional, Tuple
 from difflib import SequenceMatcher
-from collections import defaultdict
+from collections import Counter
+from functools import lru_cache
+from itertools import chain
+from operator import attrgetter, itemgetter
 from datetime import datetime
 
 from config import CSV_FIELDS, OUTPUT_FORMATS, AUTHOR_MATCHING
+from models import CommitRow
+
+try:
+    # Optional accelerator: C++ Indel similarity ratio. It never scores below difflib's
+    # Ratcliff-Obershelp ratio, so fuzzy author matches can be broader when it is installed
+    from rapidfuzz import fuzz, process
+except ImportError:
+    fuzz = process = None
+
+try:
+    # Optional: columnar Parquet output
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
 
 logger = logging.getLogger(__name__)
 
+def write_console(lines: Iterable[str]) -> None:
+    """Write lines to stdout in one call, replacing characters (e.g. emoji) the console cannot encode"""
+    text = "\n".join(lines) + "\n"
+    encoding = sys.stdout.encoding or "utf-8"
+    if encoding.lower().replace("-", "") != "utf8":
+        text = text.encode(encoding, errors="replace").decode(encoding)
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+def parquet_available() -> bool:
+    """Check whether the optional pyarrow dependency for Parquet output is installed"""
+    return pa is not None
+
+@lru_cache(maxsize=None)
+def _resolve_fieldnames(include_branches: bool,
+                        include_stats: bool) -> Tuple[List[str], Callable[[CommitRow], Tuple]]:
+    """Resolve CSV columns and a row extractor for the collected schema"""
+    if include_stats:
+        fieldnames = CSV_FIELDS["with_stats"]
+    elif include_branches:
+        fieldnames = CSV_FIELDS["with_branches"]
+    else:
+        fieldnames = CSV_FIELDS["basic"]
+    
+    # Every CommitRow carries all fields, so rows are pulled out as tuples directly
+    return fieldnames, attrgetter(*fieldnames)
+
+class StatisticsAccumulator:
+    """Running commit statistics, updated one batch of commits at a time"""
+    
+    def __init__(self, include_stats: bool = False, largest_limit: int = 10):
+        self.include_stats = include_stats
+        self.largest_limit = largest_limit
+        self.total_commits = 0
+        self.repository_breakdown = Counter()
+        self.author_breakdown = Counter()
+        self.branch_breakdown = Counter()
+        self.earliest: Optional[str] = None
+        self.latest: Optional[str] = None
+        self.additions_by_repo = Counter()
+        self.deletions_by_repo = Counter()
+        self.largest_commits: List[CommitRow] = []  # Kept only when include_stats is set
+    
+    def add(self, commits: List[CommitRow]) -> None:
+        """Fold a batch of commits into the running totals"""
+        if not commits:
+            return
+        
+        # Pull each field out once as a column; counting and min/max then run in C
+        repositories = list(map(attrgetter('repository'), commits))
+        timestamps = list(map(attrgetter('timestamp'), commits))
+        
+        self.total_commits += len(commits)
+        self.repository_breakdown.update(repositories)
+        self.author_breakdown.update(map(attrgetter('author'), commits))
+        self.branch_breakdown.update(f"{c.repository}:{c.branch}" for c in commits if c.branch is not None)
+        
+        # ISO timestamps order lexicographically
+        earliest = min(timestamps)
+        latest = max(timestamps)
+        if self.earliest is None or earliest < self.earliest:
+            self.earliest = earliest
+        if self.latest is None or latest > self.latest:
+            self.latest = latest
+        
+        if self.include_stats:
+            for repo, commit in zip(repositories, commits):
+                self.additions_by_repo[repo] += commit.additions
+                self.deletions_by_repo[repo] += commit.deletions
+            
+            self.largest_commits = heapq.nlargest(
+                self.largest_limit,
+                chain(self.largest_commits, (c for c in commits if c.total_changes > 0)),
+                key=attrgetter('total_changes')
+            )
+    
+    def result(self) -> Dict:
+        """Build the statistics dict in the shape returned by DataProcessor.generate_statistics"""
+        if not self.total_commits:
+            return {}
+        
+        stats = {
+            'total_commits': self.total_commits,
+            'unique_authors': len(self.author_breakdown),
+            'unique_repositories': len(self.repository_breakdown),
+            'date_range': {
+                'earliest': self.earliest[:10],
+                'latest': self.latest[:10]
+            },
+            'repository_breakdown': self.repository_breakdown,
+            'author_breakdown': self.author_breakdown,
+            'branch_breakdown': self.branch_breakdown or None
+        }
+        
+        # Include totals if stats are available
+        if self.include_stats:
+            total_additions = sum(self.additions_by_repo.values())
+            total_deletions = sum(self.deletions_by_repo.values())
+            stats.update({
+                'total_additions': total_additions,
+                'total_deletions': total_deletions,
+                'net_changes': total_additions - total_deletions,
+                'repository_stats': {
+                    repo: {
+                        'commits': count,
+                        'additions': self.additions_by_repo[repo],
+                        'deletions': self.deletions_by_repo[repo]
+                    }
+                    for repo, count in self.repository_breakdown.items()
+                }
+            })
+        
+        return stats
+
 class DataProcessor:
     """Handles data processing, filtering, and output operations"""
     
     def __init__(self):
         pass
     
-    def filter_by_author(self, commits: List[Dict], author_pattern: str) -> List[Dict]:
+    def filter_by_author(self, commits: List[CommitRow], author_pattern: str) -> List[CommitRow]:
         """Filter commits by author name with fuzzy matching"""
         if not author_pattern:
             return commits
         
-        filtered_commits = []
-        matched_authors = set()
+        # Match each distinct author once; commits vastly outnumber authors
+        matched_authors = self._match_authors({c.author for c in commits}, author_pattern)
         
-        for commit in commits:
-            if self._is_author_match(commit['author'], author_pattern):
-                filtered_commits.append(commit)
-                matched_authors.add(commit['author'])
+        filtered_commits = [c for c in commits if c.author in matched_authors]
         
         logger.info(f"Author filter '{author_pattern}' matched: {sorted(matched_authors)}")
         logger.info(f"Filtered to {len(filtered_commits)} commits from {len(commits)} total")
         
         return filtered_commits
     
-    def _is_author_match(self, author_name: str, pattern: str) -> bool:
-        """Check if author name matches the pattern with fuzzy matching"""
+    def filter_commits(self, commits: List[CommitRow], *, author: Optional[str] = None,
+                       exclude_merge: bool = False) -> List[CommitRow]:
+        """Apply the author and merge-commit filters in a single pass over the commits"""
+        if not author and not exclude_merge:
+            return commits
+        
+        # Authors are matched once up front so the pass itself is only set lookups
+        matched_authors = self._match_authors({c.author for c in commits}, author) if author else None
+        
+        filtered_commits = [
+            c for c in commits
+            if (matched_authors is None or c.author in matched_authors)
+            and not (exclude_merge and c.message.startswith('Merge'))
+        ]
+        
+        if author:
+            logger.info(f"Author filter '{author}' matched: {sorted(matched_authors)}")
+        logger.info(f"Filtered to {len(filtered_commits)} commits from {len(commits)} total")
+        
+        return filtered_commits
+    
+    def _match_authors(self, authors: Set[str], author_pattern: str) -> Set[str]:
+        """Get the subset of author names that match the pattern"""
+        pattern_lower = author_pattern.lower()
+        variations = self._generate_author_variations(pattern_lower)
+        
+        if process is not None:
+            return self._match_authors_batch(authors, pattern_lower, variations)
+        return {author for author in authors if self._is_author_match(author, pattern_lower, variations)}
+    
+    def _is_author_match(self, author_name: str, pattern_lower: str, variations: List[str]) -> bool:
+        """Check if author name matches the lowercased pattern or one of its variations"""
         author_lower = author_name.lower()
-        pattern_lower = pattern.lower()
         
         # Direct substring match
         if pattern_lower in author_lower or author_lower in pattern_lower:
             return True
         
-        # Generate variations of the pattern
-        variations = self._generate_author_variations(pattern_lower)
-        
+        similarity_threshold = AUTHOR_MATCHING["similarity_threshold"]
         for variation in variations:
-            if variation in author_lower or self._similarity(author_lower, variation) > AUTHOR_MATCHING["similarity_threshold"]:
+            if variation in author_lower:
+                return True
+            if self._similarity(author_lower, variation, similarity_threshold) > similarity_threshold:
                 return True
         
         # Overall similarity check
-        if self._similarity(author_lower, pattern_lower) > AUTHOR_MATCHING["exact_match_threshold"]:
+        exact_match_threshold = AUTHOR_MATCHING["exact_match_threshold"]
+        if self._similarity(author_lower, pattern_lower, exact_match_threshold) > exact_match_threshold:
             return True
         
         return False
     
-    def _similarity(self, a: str, b: str) -> float:
-        """Calculate similarity between two strings"""
-        return SequenceMatcher(None, a, b).ratio()
+    def _match_authors_batch(self, authors: Set[str], pattern_lower: str, variations: List[str]) -> Set[str]:
+        """Match authors like _is_author_match (with rapidfuzz scores), scoring all authors per query in one call"""
+        matched = set()
+        remaining = {}
+        
+        # Substring matches need no scoring
+        for author in authors:
+            author_lower = author.lower()
+            if (pattern_lower in author_lower or author_lower in pattern_lower
+                    or any(variation in author_lower for variation in variations)):
+                matched.add(author)
+            else:
+                remaining[author] = author_lower
+        
+        queries = [(variation, AUTHOR_MATCHING["similarity_threshold"]) for variation in variations]
+        queries.append((pattern_lower, AUTHOR_MATCHING["exact_match_threshold"]))
+        
+        for query, threshold in queries:
+            if not remaining:
+                break
+            
+            # extract_iter streams hits without the sort extract() does; order is irrelevant here
+            cutoff = threshold * 100
+            hits = [
+                author for _, score, author
+                in process.extract_iter(query, remaining, scorer=fuzz.ratio, score_cutoff=cutoff)
+                if score > cutoff
+            ]
+            matched.update(hits)
+            for author in hits:
+                del remaining[author]
+        
+        return matched
+    
+    def _similarity(self, a: str, b: str, cutoff: float = 0.0) -> float:
+        """Calculate similarity between two strings (0.0 - 1.0)
+        
+        Returns 0.0 without scoring when the result cannot exceed ``cutoff``.
+        """
+        if a == b:
+            return 1.0
+        
+        # The ratio is bounded by 2 * len(shorter) / (len(a) + len(b))
+        total_length = len(a) + len(b)
+        if 2.0 * min(len(a), len(b)) <= cutoff * total_length:
+            return 0.0
+        
+        if fuzz is not None:
+            return fuzz.ratio(a, b, score_cutoff=cutoff * 100) / 100.0
+        
+        # quick_ratio() is a cheap multiset bound on ratio(); skip the full match below it
+        matcher = SequenceMatcher(None, a, b)
+        if matcher.quick_ratio() <= cutoff:
+            return 0.0
+        return matcher.ratio()
     
     def _generate_author_variations(self, pattern: str) -> List[str]:
         """Generate common variations of an author name"""
@@ -87,167 +301,176 @@ class DataProcessor:
         
         return list(set(variations))
     
-    def exclude_merge_commits(self, commits: List[Dict]) -> List[Dict]:
+    def exclude_merge_commits(self, commits: List[CommitRow]) -> List[CommitRow]:
         """Filter out merge commits"""
-        filtered = [c for c in commits if not c['message'].startswith('Merge')]
+        filtered = [c for c in commits if not c.message.startswith('Merge')]
         logger.info(f"Excluded {len(commits) - len(filtered)} merge commits")
         return filtered
     
-    def generate_statistics(self, commits: List[Dict]) -> Dict:
+    def generate_statistics(self, commits: List[CommitRow], include_stats: bool = False) -> Dict:
         """Generate comprehensive statistics from commit data"""
-        if not commits:
-            return {}
-        
-        stats = {
-            'total_commits': len(commits),
-            'unique_authors': len(set(c['author'] for c in commits)),
-            'unique_repositories': len(set(c['repository'] for c in commits)),
-            'date_range': {
-                'earliest': min(c['timestamp'][:10] for c in commits),
-                'latest': max(c['timestamp'][:10] for c in commits)
-            },
-            'repository_breakdown': defaultdict(int),
-            'author_breakdown': defaultdict(int),
-            'branch_breakdown': defaultdict(int) if 'branch' in commits[0] else None
-        }
-        
-        # Calculate totals if stats are available
-        if 'additions' in commits[0]:
-            total_additions = sum(c.get('additions', 0) for c in commits)
-            total_deletions = sum(c.get('deletions', 0) for c in commits)
-            stats.update({
-                'total_additions': total_additions,
-                'total_deletions': total_deletions,
-                'net_changes': total_additions - total_deletions,
-                'repository_stats': defaultdict(lambda: {'commits': 0, 'additions': 0, 'deletions': 0})
-            })
-        
-        # Aggregate data
-        for commit in commits:
-            repo = commit['repository']
-            author = commit['author']
-            
-            stats['repository_breakdown'][repo] += 1
-            stats['author_breakdown'][author] += 1
-            
-            if stats['branch_breakdown'] is not None and 'branch' in commit:
-                branch_key = f"{repo}:{commit['branch']}"
-                stats['branch_breakdown'][branch_key] += 1
-            
-            if 'additions' in commit:
-                repo_stats = stats['repository_stats'][repo]
-                repo_stats['commits'] += 1
-                repo_stats['additions'] += commit.get('additions', 0)
-                repo_stats['deletions'] += commit.get('deletions', 0)
-        
-        return stats
+        accumulator = StatisticsAccumulator(include_stats)
+        accumulator.add(commits)
+        return accumulator.result()
     
     def print_statistics(self, stats: Dict) -> None:
         """Print formatted statistics to console"""
+        write_console(self.format_statistics(stats))
+    
+    def format_statistics(self, stats: Dict) -> List[str]:
+        """Format statistics as console lines"""
         if not stats:
-            print("No statistics available")
-            return
+            return ["No statistics available"]
         
         prefix = OUTPUT_FORMATS["console"]["info_prefix"]
+        lines = [
+            f"\n{prefix} Commit Collection Statistics:",
+            f"   - Total commits: {stats['total_commits']:,}",
+            f"   - Unique authors: {stats['unique_authors']}",
+            f"   - Repositories: {stats['unique_repositories']}",
+            f"   - Date range: {stats['date_range']['earliest']} to {stats['date_range']['latest']}"
+        ]
         
-        print(f"\n{prefix} Commit Collection Statistics:")
-        print(f"   - Total commits: {stats['total_commits']:,}")
-        print(f"   - Unique authors: {stats['unique_authors']}")
-        print(f"   - Repositories: {stats['unique_repositories']}")
-        print(f"   - Date range: {stats['date_range']['earliest']} to {stats['date_range']['latest']}")
-        
-        # Print code change statistics if available
+        # Code change statistics if available
         if 'total_additions' in stats:
-            print(f"   - Lines added: {stats['total_additions']:,}")
-            print(f"   - Lines deleted: {stats['total_deletions']:,}")
-            print(f"   - Net change: {stats['net_changes']:+,}")
+            lines.append(f"   - Lines added: {stats['total_additions']:,}")
+            lines.append(f"   - Lines deleted: {stats['total_deletions']:,}")
+            lines.append(f"   - Net change: {stats['net_changes']:+,}")
         
         # Top repositories
         if stats['repository_breakdown']:
-            print(f"\n📈 Top repositories by commit count:")
-            top_repos = sorted(stats['repository_breakdown'].items(), key=lambda x: x[1], reverse=True)[:10]
-            for repo, count in top_repos:
-                print(f"   - {repo}: {count} commits")
+            lines.append(f"\n📈 Top repositories by commit count:")
+            lines.extend(f"   - {repo}: {count} commits"
+                         for repo, count in stats['repository_breakdown'].most_common(10))
         
         # Top authors
         if len(stats['author_breakdown']) > 1:  # Only show if multiple authors
-            print(f"\n👥 Top contributors:")
-            top_authors = sorted(stats['author_breakdown'].items(), key=lambda x: x[1], reverse=True)[:5]
-            for author, count in top_authors:
-                print(f"   - {author}: {count} commits")
+            lines.append(f"\n👥 Top contributors:")
+            lines.extend(f"   - {author}: {count} commits"
+                         for author, count in stats['author_breakdown'].most_common(5))
         
         # Repository statistics with code changes
         if 'repository_stats' in stats and stats['repository_stats']:
-            print(f"\n💾 Repository breakdown with code changes:")
+            lines.append(f"\n💾 Repository breakdown with code changes:")
             for repo, repo_stats in sorted(stats['repository_stats'].items(), 
                                          key=lambda x: x[1]['commits'], reverse=True)[:10]:
                 net_change = repo_stats['additions'] - repo_stats['deletions']
-                print(f"   - {repo}: {repo_stats['commits']} commits, "
-                      f"+{repo_stats['additions']:,}/-{repo_stats['deletions']:,} "
-                      f"(net: {net_change:+,})")
+                lines.append(f"   - {repo}: {repo_stats['commits']} commits, "
+                             f"+{repo_stats['additions']:,}/-{repo_stats['deletions']:,} "
+                             f"(net: {net_change:+,})")
+        
+        return lines
     
-    def save_to_csv(self, commits: List[Dict], filename: str, include_branches: bool = False, 
+    def save_to_csv(self, commits: List[CommitRow], filename: str, include_branches: bool = False, 
                    include_stats: bool = False) -> None:
         """Save commits to CSV file with appropriate field selection"""
         if not commits:
             logger.warning("No commits to save")
             return
         
-        # Determine field names based on data structure
-        if include_stats and 'additions' in commits[0]:
-            fieldnames = CSV_FIELDS["with_stats"]
-        elif include_branches and 'branch' in commits[0]:
-            fieldnames = CSV_FIELDS["with_branches"]
-        else:
-            fieldnames = CSV_FIELDS["basic"]
-        
-        # Filter fieldnames to only include fields present in the data
-        available_fields = set(commits[0].keys())
-        fieldnames = [field for field in fieldnames if field in available_fields]
+        fieldnames, row_getter = _resolve_fieldnames(include_branches, include_stats)
         
         try:
             with open(filename, 'w', newline=OUTPUT_FORMATS["csv"]["newline"], 
                      encoding=OUTPUT_FORMATS["csv"]["encoding"]) as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
+                writer = csv.writer(csvfile)
+                writer.writerow(fieldnames)
                 
-                for commit in commits:
-                    # Only write fields that exist in the commit data
-                    row = {field: commit.get(field, '') for field in fieldnames}
-                    writer.writerow(row)
+                writer.writerows(map(row_getter, commits))
             
             logger.info(f"✅ Saved {len(commits)} commits to {filename}")
             
         except IOError as e:
             raise Exception(f"Failed to save CSV file: {e}")
     
-    def load_from_csv(self, filename: str) -> List[Dict]:
+    def save_to_parquet(self, commits: List[CommitRow], filename: str, include_branches: bool = False,
+                        include_stats: bool = False) -> None:
+        """Save commits to a compressed Parquet file with the same columns as the CSV output"""
+        if pa is None:
+            raise Exception("Parquet output requires pyarrow (pip install pyarrow)")
+        
+        if not commits:
+            logger.warning("No commits to save")
+            return
+        
+        fieldnames, _ = _resolve_fieldnames(include_branches, include_stats)
+        table = pa.table({field: list(map(attrgetter(field), commits)) for field in fieldnames})
+        
+        try:
+            pq.write_table(table, filename, compression=OUTPUT_FORMATS["parquet"]["compression"])
+            logger.info(f"✅ Saved {len(commits)} commits to {filename}")
+            
+        except (IOError, pa.ArrowException) as e:
+            raise Exception(f"Failed to save Parquet file: {e}")
+    
+    def stream_to_csv(self, batches: Iterable[List[CommitRow]], filename: str, include_branches: bool = False,
+                      include_stats: bool = False, author_pattern: Optional[str] = None,
+                      exclude_merges: bool = False) -> StatisticsAccumulator:
+        """Filter and write commit batches to CSV as they arrive, keeping only running statistics
+        
+        Rows are written in arrival order rather than newest first. The file is removed
+        if no commits pass the filters.
+        """
+        fieldnames, row_getter = _resolve_fieldnames(include_branches, include_stats)
+        accumulator = StatisticsAccumulator(include_stats)
+        
+        # Authors are matched the first time they are seen
+        seen_authors: Set[str] = set()
+        matched_authors: Set[str] = set()
+        
+        try:
+            with open(filename, 'w', newline=OUTPUT_FORMATS["csv"]["newline"], 
+                     encoding=OUTPUT_FORMATS["csv"]["encoding"]) as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(fieldnames)
+                
+                for commits in batches:
+                    if exclude_merges:
+                        commits = [c for c in commits if not c.message.startswith('Merge')]
+                    if author_pattern:
+                        new_authors = {c.author for c in commits} - seen_authors
+                        if new_authors:
+                            seen_authors |= new_authors
+                            matched_authors |= self._match_authors(new_authors, author_pattern)
+                        commits = [c for c in commits if c.author in matched_authors]
+                    
+                    writer.writerows(map(row_getter, commits))
+                    accumulator.add(commits)
+            
+            if not accumulator.total_commits:
+                os.remove(filename)
+                logger.warning("No commits to save")
+            else:
+                logger.info(f"✅ Saved {accumulator.total_commits} commits to {filename}")
+            
+        except IOError as e:
+            raise Exception(f"Failed to save CSV file: {e}")
+        
+        return accumulator
+    
+    def load_from_csv(self, filename: str) -> List[CommitRow]:
         """Load commits from CSV file"""
         try:
             commits = []
             with open(filename, 'r', encoding=OUTPUT_FORMATS["csv"]["encoding"]) as csvfile:
                 reader = csv.DictReader(csvfile)
-                commits = list(reader)
+                commits = [CommitRow.from_csv_row(row) for row in reader]
             
             logger.info(f"Loaded {len(commits)} commits from {filename}")
             return commits
             
         except IOError as e:
             raise Exception(f"Failed to load CSV file: {e}")
+        except (KeyError, ValueError) as e:
+            raise Exception(f"Invalid commit data in CSV file: {e}")
     
-    def find_largest_commits(self, commits: List[Dict], limit: int = 10) -> List[Dict]:
+    def find_largest_commits(self, commits: List[CommitRow], limit: int = 10) -> List[CommitRow]:
         """Find commits with the most changes (requires stats data)"""
-        if not commits or 'total_changes' not in commits[0]:
-            return []
-        
-        # Filter out commits with no changes and sort by total changes
-        commits_with_changes = [c for c in commits if c.get('total_changes', 0) > 0]
-        return sorted(commits_with_changes, key=lambda x: int(x.get('total_changes', 0)), reverse=True)[:limit]
+        # Top-k selection over commits with changes; avoids sorting the whole list
+        return heapq.nlargest(limit, (c for c in commits if c.total_changes > 0), key=attrgetter('total_changes'))
     
-    def get_commit_timeline(self, commits: List[Dict]) -> Dict[str, int]:
+    def get_commit_timeline(self, commits: List[CommitRow]) -> Dict[str, int]:
         """Get commit count by date"""
-        timeline = defaultdict(int)
-        for commit in commits:
-            date = commit['timestamp'][:10]  # Extract YYYY-MM-DD
-            timeline[date] += 1
-        return dict(timeline)
\ No newline at end of file
+        # Slice YYYY-MM-DD out of the timestamp column and count in C
+        date_of = itemgetter(slice(0, 10))
+        return dict(Counter(map(date_of, map(attrgetter('timestamp'), commits))))
\ No newline at end of file
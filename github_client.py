@@ -3,147 +3,451 @@
 GitHub API client for collecting commit information
 """
 
-import subprocess
+import gzip
+import http.client
 import json
 import logging
+import multiprocessing
+import os
+import random
+import re
+import ssl
+import sys
+import threading
 import time
-from typing import List, Dict, Optional, Set
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import asdict
+import traceback
+import zlib
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from dataclasses import asdict, dataclass, replace
+from itertools import chain, cycle
+from operator import attrgetter
+from urllib.parse import quote, urlencode, urlsplit
 
-from config import CollectionConfig, GITHUB_COMMANDS, PERFORMANCE_SETTINGS
+from config import (CollectionConfig, GITHUB_API, PERFORMANCE_SETTINGS, CACHE_SETTINGS, OUTPUT_FORMATS,
+                    get_github_token)
+from models import CommitRow
+from response_cache import open_response_cache
+
+try:
+    # Optional accelerator: Rust JSON parser/serializer working on bytes directly
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    json_loads = json.loads
+    
+    def json_dumps(obj: Any) -> bytes:
+        """Serialize to UTF-8 JSON bytes, matching orjson.dumps"""
+        return json.dumps(obj).encode()
 
 logger = logging.getLogger(__name__)
 
+# Matches the next page URL in a Link response header
+_NEXT_LINK_RE = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+# Flattens commit messages onto a single CSV-friendly line
+_NEWLINE_TABLE = str.maketrans({'\n': ' ', '\r': ' '})
+
+# (sha, message, author name, author date, additions, deletions) of one commit
+_CommitFields = Tuple[str, str, str, str, int, int]
+
+def _rest_commit_fields(item: Dict) -> _CommitFields:
+    """Pick the commit row fields out of a commits API entry"""
+    commit_data = item['commit']
+    return item['sha'], commit_data['message'], commit_data['author']['name'], commit_data['author']['date'], 0, 0
+
+def _history_commit_fields(node: Dict) -> _CommitFields:
+    """Pick the commit row fields out of a GraphQL history node; stats are only selected with --stats"""
+    return (node['oid'], node['message'], node['author']['name'], node['authoredDate'],
+            node.get('additions') or 0, node.get('deletions') or 0)
+
+def _valid_commit_fields(entries: Iterable[Any], get_fields: Callable[[Any], _CommitFields]) -> Iterator[_CommitFields]:
+    """Yield the fields of each entry that has all of them, skipping malformed entries"""
+    for entry in entries:
+        try:
+            fields = get_fields(entry)
+        except (KeyError, TypeError, AttributeError):
+            continue
+        if all(isinstance(value, str) for value in fields[:4]):
+            yield fields
+
+def _sorted_commits(batches: Iterable[List[CommitRow]]) -> List[CommitRow]:
+    """Gather batches of commits into one list, newest first"""
+    all_commits = list(chain.from_iterable(batches))
+    
+    # Sort by timestamp (newest first); ISO strings sort lexicographically
+    all_commits.sort(key=attrgetter('timestamp'), reverse=True)
+    
+    logger.info(f"Collected {len(all_commits)} total commits")
+    return all_commits
+
 class GitHubAPIError(Exception):
     """Custom exception for GitHub API errors"""
-    pass
+    
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+class TokenPool:
+    """Round-robin rotation over API tokens that skips tokens until their rate limit resets"""
+    
+    def __init__(self, tokens: List[str]):
+        self._tokens = list(dict.fromkeys(tokens))
+        self._rotation = cycle(self._tokens)
+        self._exhausted_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._tokens)
+    
+    @property
+    def tokens(self) -> List[str]:
+        """All tokens in rotation order"""
+        return list(self._tokens)
+    
+    def next_token(self) -> str:
+        """Get the next token with quota left, or the one that resets soonest if all are exhausted"""
+        with self._lock:
+            now = time.time()
+            for _ in range(len(self._tokens)):
+                token = next(self._rotation)
+                if self._exhausted_until.get(token, 0) <= now:
+                    return token
+            return min(self._tokens, key=self._exhausted_until.__getitem__)
+    
+    def mark_exhausted(self, token: str, reset_at: float) -> None:
+        """Skip a token until its rate limit window resets"""
+        with self._lock:
+            self._exhausted_until[token] = reset_at
+    
+    def has_available(self) -> bool:
+        """Check whether any token still has quota left"""
+        with self._lock:
+            now = time.time()
+            return any(self._exhausted_until.get(token, 0) <= now for token in self._tokens)
+
+class AdaptiveLimiter:
+    """Paces requests from X-RateLimit-Remaining/Reset feedback so a window is not exhausted early"""
+    
+    def __init__(self, threshold: int):
+        self._threshold = threshold
+        self._remaining: Optional[int] = None
+        self._reset_at = 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Block until the next request may be sent"""
+        with self._lock:
+            now = time.time()
+            interval = 0.0
+            # Once quota runs low, spread what is left evenly until the reset; an empty
+            # window is left to the retry logic, which caps how long it will wait
+            if self._remaining and self._remaining < self._threshold and self._reset_at > now:
+                interval = (self._reset_at - now) / self._remaining
+                self._remaining -= 1
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + interval
+        
+        if slot > now:
+            time.sleep(slot - now)
+    
+    def update(self, headers: http.client.HTTPMessage) -> None:
+        """Record the rate limit state reported with a response"""
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_at = headers.get("X-RateLimit-Reset")
+        if not (remaining and remaining.isdigit() and reset_at and reset_at.isdigit()):
+            return
+        
+        with self._lock:
+            self._remaining = int(remaining)
+            self._reset_at = float(reset_at)
+
+@dataclass
+class APIResponse:
+    """Raw response from the GitHub API"""
+    status: int
+    headers: http.client.HTTPMessage
+    body: bytes
+    
+    def json(self) -> Any:
+        """Decode the response body as JSON"""
+        return json_loads(self.body) if self.body else None
 
 class GitHubClient:
-    """Client for interacting with GitHub API via GitHub CLI"""
+    """Client for interacting with the GitHub REST and GraphQL APIs"""
     
     def __init__(self, config: CollectionConfig):
         self.config = config
         self.org = config.organization
         
-    def _run_command(self, cmd: List[str], timeout: Optional[int] = None) -> subprocess.CompletedProcess:
-        """Execute a command with error handling and retries"""
+        tokens = config.tokens or [token for token in (get_github_token(),) if token]
+        if not tokens:
+            raise GitHubAPIError("No GitHub token found. Set GH_TOKEN or run 'gh auth login'")
+        
+        # Each request authenticates with the next token in the rotation
+        self._tokens = TokenPool(tokens)
+        # Rate limits are tracked per token and per API (REST core vs GraphQL)
+        self._limiters: Dict[Tuple[str, str], AdaptiveLimiter] = {}
+        self._headers = dict(GITHUB_API["headers"])
+        
+        # The organization and date window are fixed per client, so encode them once
+        self._org_path = quote(self.org, safe="")
+        commit_params = {"since": config.since_date, "per_page": GITHUB_API["per_page"]}
+        if config.until_date:
+            commit_params["until"] = config.until_date
+        self._commits_query = urlencode(commit_params)
+        # Keep-alive connections are not thread-safe, so each worker thread gets its own
+        self._local = threading.local()
+        # One TLS context for every connection, so the CA store is loaded once rather than per connect
+        self._ssl_context = ssl.create_default_context()
+        self._ssl_context.set_alpn_protocols(["http/1.1"])
+        # Resolved full SHAs keyed by (repo, short_sha)
+        self._sha_cache: Dict[Tuple[str, str], str] = {}
+        # Validators and bodies of earlier responses, revalidated with conditional requests
+        cache_dir = config.cache_dir or CACHE_SETTINGS["directory"]
+        self._cache = open_response_cache(os.path.join(cache_dir, CACHE_SETTINGS["etag_db"]),
+                                          max_age=CACHE_SETTINGS["max_age_days"] * 86400)
+    
+    def _get_connection(self, timeout: int) -> http.client.HTTPSConnection:
+        """Get this thread's persistent connection, creating it if needed"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = http.client.HTTPSConnection(GITHUB_API["host"], timeout=timeout, context=self._ssl_context)
+            self._local.connection = connection
+        else:
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+        return connection
+    
+    def _close_connection(self) -> None:
+        """Drop this thread's connection so the next request reconnects"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+    
+    def _request(self, method: str, path: str, body: Optional[bytes] = None,
+                 timeout: Optional[int] = None, headers: Optional[Dict[str, str]] = None) -> APIResponse:
+        """Send an API request with error handling and retries"""
         timeout = timeout or self.config.timeout_seconds
+        headers = dict(self._headers, **headers) if headers else self._headers
+        if body is not None:
+            headers = dict(headers, **{"Content-Type": "application/json"})
         
-        for attempt in range(PERFORMANCE_SETTINGS["retry_attempts"]):
+        # Switching to a token with quota left is not a retry, so only real retries advance attempt
+        attempt = 0
+        while attempt < PERFORMANCE_SETTINGS["retry_attempts"]:
+            is_last_attempt = attempt == PERFORMANCE_SETTINGS["retry_attempts"] - 1
+            connection = self._get_connection(timeout)
+            token = self._tokens.next_token()
+            limiter = self._get_limiter(token, path)
+            limiter.acquire()
+            
             try:
-                result = subprocess.run(
-                    cmd, 
-                    capture_output=True, 
-                    text=True, 
-                    timeout=timeout
-                )
-                
-                if result.returncode == 0:
-                    return result
-                
-                # If it's the last attempt, raise an error
-                if attempt == PERFORMANCE_SETTINGS["retry_attempts"] - 1:
-                    raise GitHubAPIError(f"Command failed: {' '.join(cmd)}\nError: {result.stderr}")
+                connection.request(method, path, body=body, headers=dict(headers, Authorization=f"Bearer {token}"))
+                response = connection.getresponse()
+                data = response.read()
+                if response.headers.get("Content-Encoding") == "gzip":
+                    data = gzip.decompress(data)
                 
-                # Wait before retry
-                time.sleep(PERFORMANCE_SETTINGS["retry_delay"] * (attempt + 1))
-                
-            except subprocess.TimeoutExpired:
-                if attempt == PERFORMANCE_SETTINGS["retry_attempts"] - 1:
-                    raise GitHubAPIError(f"Command timed out: {' '.join(cmd)}")
-                time.sleep(PERFORMANCE_SETTINGS["retry_delay"] * (attempt + 1))
+            except (http.client.HTTPException, OSError, EOFError, zlib.error) as e:
+                # Covers timeouts, connections dropped by the server and corrupt gzip bodies
+                self._close_connection()
+                if is_last_attempt:
+                    raise GitHubAPIError(f"Request failed: {method} {path}\nError: {e}")
+                time.sleep(self._retry_delay(attempt))
+                attempt += 1
+                continue
+            
+            limiter.update(response.headers)
+            if response.status < 400:
+                return APIResponse(response.status, response.headers, data)
+            
+            error = GitHubAPIError(
+                f"Request failed: {method} {path}\nStatus: {response.status} {data.decode(errors='replace')}",
+                status=response.status
+            )
+            
+            # Other client errors will not succeed on retry
+            if response.status < 500 and response.status not in (403, 429):
+                raise error
+            
+            # An exhausted token sits out until its reset; retry at once if another one has quota
+            reset_at = response.headers.get("X-RateLimit-Reset")
+            if (response.headers.get("X-RateLimit-Remaining") == "0" and reset_at and reset_at.isdigit()
+                    and int(reset_at) > time.time()):
+                self._tokens.mark_exhausted(token, int(reset_at))
+                if self._tokens.has_available():
+                    logger.debug(f"Token rate limit exhausted on {path}, rotating to the next token")
+                    continue
+            
+            if is_last_attempt:
+                raise error
+            
+            # Wait before retry
+            delay = self._retry_delay(attempt, response.headers)
+            if delay > PERFORMANCE_SETTINGS["max_rate_limit_wait"]:
+                raise GitHubAPIError(f"Rate limit exceeded for {path}; resets in {delay:.0f}s",
+                                     status=response.status)
+            if delay > PERFORMANCE_SETTINGS["retry_delay"] * 2 ** (attempt + 1):
+                logger.warning(f"Rate limited on {path}, waiting {delay:.0f}s")
+            time.sleep(delay)
+            attempt += 1
+        
+        raise GitHubAPIError(f"All retry attempts failed for request: {method} {path}")
+    
+    def _get_limiter(self, token: str, path: str) -> AdaptiveLimiter:
+        """Get the rate limiter for a token and the API a request path belongs to"""
+        resource = "graphql" if path == GITHUB_API["graphql"] else "core"
+        limiter = self._limiters.get((token, resource))
+        if limiter is None:
+            limiter = self._limiters.setdefault(
+                (token, resource), AdaptiveLimiter(PERFORMANCE_SETTINGS["rate_limit_pacing_threshold"])
+            )
+        return limiter
+    
+    def _retry_delay(self, attempt: int, headers: Optional[http.client.HTTPMessage] = None) -> float:
+        """Seconds to wait before retrying, honoring GitHub's rate limit headers"""
+        # Jitter keeps workers throttled together (e.g. by a secondary rate limit) from retrying in lockstep
+        backoff = PERFORMANCE_SETTINGS["retry_delay"] * 2 ** attempt
+        backoff += random.uniform(0, backoff)
+        if headers is None:
+            return backoff
+        
+        retry_after = headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return max(backoff, float(retry_after))
+        
+        reset_at = headers.get("X-RateLimit-Reset")
+        if headers.get("X-RateLimit-Remaining") == "0" and reset_at and reset_at.isdigit():
+            return max(backoff, int(reset_at) - time.time() + 1)
         
-        raise GitHubAPIError(f"All retry attempts failed for command: {' '.join(cmd)}")
+        return backoff
+    
+    def _build_path(self, endpoint: str, params: Optional[Dict] = None, **fields: str) -> str:
+        """Fill an endpoint template and append URL-encoded query parameters"""
+        path = GITHUB_API[endpoint].format(
+            org=self._org_path,
+            **{name: quote(value, safe="") for name, value in fields.items()}
+        )
+        if params:
+            path += "?" + urlencode(params)
+        return path
+    
+    def _get(self, path: str, timeout: Optional[int] = None) -> APIResponse:
+        """GET an API resource, revalidating any cached copy with its ETag/Last-Modified"""
+        cached = self._cache.get(path) if self._cache else None
+        headers = {}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        response = self._request("GET", path, timeout=timeout, headers=headers)
+        
+        if response.status == 304 and cached:
+            # Not modified: the server sent no body and charged no rate limit
+            cached_headers = http.client.HTTPMessage()
+            if cached.link:
+                cached_headers["Link"] = cached.link
+            return APIResponse(200, cached_headers, cached.body)
+        
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if self._cache and (etag or last_modified):
+            self._cache.put(path, etag, last_modified, response.headers.get("Link"), response.body)
+        return response
+    
+    def _get_json(self, path: str, timeout: Optional[int] = None) -> Any:
+        """GET a single API resource and decode its JSON body"""
+        return self._get(path, timeout=timeout).json()
+    
+    def _get_paginated(self, path: str, timeout: Optional[int] = None) -> List[Any]:
+        """GET every page of a list endpoint by following Link headers"""
+        items = []
+        
+        while path:
+            response = self._get(path, timeout=timeout)
+            items.extend(response.json() or [])
+            
+            match = _NEXT_LINK_RE.search(response.headers.get("Link", ""))
+            if match:
+                next_url = urlsplit(match.group(1))
+                path = f"{next_url.path}?{next_url.query}"
+            else:
+                path = None
+        
+        return items
     
     def get_repositories(self) -> List[str]:
         """Get list of repositories for the organization"""
-        cmd = [c.format(org=self.org) if "{org}" in c else c for c in GITHUB_COMMANDS["list_repos"]]
+        params = {"per_page": GITHUB_API["per_page"]}
         
         try:
-            result = self._run_command(cmd)
-            repo_data = json.loads(result.stdout)
+            try:
+                repo_data = self._get_paginated(self._build_path("list_org_repos", params))
+            except GitHubAPIError as e:
+                if e.status != 404:
+                    raise
+                # Not an organization; list the user's repositories instead
+                repo_data = self._get_paginated(self._build_path("list_user_repos", params))
+            
             repositories = [repo['name'] for repo in repo_data]
             logger.info(f"Found {len(repositories)} repositories in {self.org}")
             return repositories
             
-        except (json.JSONDecodeError, KeyError) as e:
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
             raise GitHubAPIError(f"Failed to parse repository list: {e}")
     
     def get_branches(self, repo: str) -> List[str]:
         """Get all branches for a repository"""
-        cmd = [c.format(org=self.org, repo=repo) if any(p in c for p in ["{org}", "{repo}"]) else c 
-               for c in GITHUB_COMMANDS["list_branches"]]
+        path = self._build_path("list_branches", {"per_page": GITHUB_API["per_page"]}, repo=repo)
         
         try:
-            result = self._run_command(cmd, timeout=15)
-            
-            if not result.stdout.strip():
-                return ["main", "master"]  # fallback
+            branch_data = self._get_paginated(path, timeout=15)
+            branches = [branch['name'] for branch in branch_data if branch.get('name')]
+            return branches if branches else ["main", "master"]  # fallback
             
-            branches = [line.strip() for line in result.stdout.strip().split('\n') if line.strip()]
-            return branches if branches else ["main", "master"]
-            
-        except GitHubAPIError:
+        except (GitHubAPIError, json.JSONDecodeError, KeyError, TypeError, AttributeError):
             logger.warning(f"Failed to get branches for {repo}, using defaults")
             return ["main", "master"]
     
-    def get_commits_for_branch(self, repo: str, branch: str) -> List[Dict]:
+    def get_commits_for_branch(self, repo: str, branch: str) -> List[CommitRow]:
         """Get commits for a specific repository branch"""
-        cmd_template = GITHUB_COMMANDS["get_commits"]
-        cmd = []
-        
-        for part in cmd_template:
-            if "{org}" in part and "{repo}" in part:
-                cmd.append(part.format(org=self.org, repo=repo))
-            elif "{org}" in part:
-                cmd.append(part.format(org=self.org))
-            elif "{repo}" in part:
-                cmd.append(part.format(repo=repo))
-            elif "{branch}" in part:
-                cmd.append(part.format(branch=branch))
-            elif "{since}" in part:
-                cmd.append(part.format(since=self.config.since_date))
-            else:
-                cmd.append(part)
-        
-        # Add until date if specified
-        if self.config.until_date:
-            cmd.extend(["-f", f"until={self.config.until_date}"])
+        path = f"{self._build_path('get_commits', repo=repo)}?sha={quote(branch, safe='')}&{self._commits_query}"
         
         try:
-            result = self._run_command(cmd)
-            
-            if not result.stdout.strip():
-                return []
-            
-            commits = []
-            for line in result.stdout.strip().split('\n'):
-                if line.strip():
-                    try:
-                        commit_data = json.loads(line)
-                        
-                        # Filter merge commits if requested
-                        if self.config.exclude_merge_commits and commit_data['message'].startswith('Merge'):
-                            continue
-                        
-                        commits.append({
-                            'timestamp': commit_data['date'],
-                            'repository': repo,
-                            'branch': branch,
-                            'message': commit_data['message'].replace('\n', ' ').replace('\r', ' ').strip()[:500],
-                            'author': commit_data['author'],
-                            'sha': commit_data['sha'][:8]
-                        })
-                    except (json.JSONDecodeError, KeyError) as e:
-                        logger.warning(f"Failed to parse commit in {repo}:{branch}: {e}")
-                        continue
-            
-            return commits
-            
-        except GitHubAPIError as e:
+            commit_list = self._get_paginated(path)
+        except (GitHubAPIError, json.JSONDecodeError) as e:
             logger.error(f"Failed to get commits for {repo}:{branch}: {e}")
             return []
+        
+        try:
+            return self._build_commit_rows(map(_rest_commit_fields, commit_list), repo, branch)
+        except (KeyError, TypeError, AttributeError) as e:
+            # Drop the malformed entries and keep the rest of the branch
+            logger.warning(f"Failed to parse commit in {repo}:{branch}: {e}")
+            return self._build_commit_rows(_valid_commit_fields(commit_list, _rest_commit_fields), repo, branch)
+    
+    def _build_commit_rows(self, entries: Iterable[_CommitFields], repo: str, branch: str) -> List[CommitRow]:
+        """Build commit rows from REST or GraphQL commit fields, skipping merges if configured"""
+        exclude_merges = self.config.exclude_merge_commits
+        
+        return [
+            CommitRow(
+                timestamp=date,
+                repository=repo,
+                branch=branch,
+                message=message.translate(_NEWLINE_TABLE).strip()[:500],
+                author=author,
+                sha=sha[:8],
+                additions=additions,
+                deletions=deletions,
+                total_changes=additions + deletions
+            )
+            for sha, message, author, date, additions, deletions in entries
+            if not (exclude_merges and message.startswith('Merge'))
+        ]
     
     def get_commit_stats(self, repo: str, sha: str) -> Dict[str, int]:
         """Get statistics (additions/deletions) for a specific commit"""
@@ -155,24 +459,55 @@ class GitHubClient:
         if len(sha) <= 8:
             full_sha = self._get_full_sha(repo, sha)
         
-        # Simplified command construction
-        cmd = [
-            "gh", "api", f"/repos/{self.org}/{repo}/commits/{full_sha}",
-            "--jq", ".stats | {additions: .additions, deletions: .deletions, total: .total}"
-        ]
-        
         try:
-            result = self._run_command(cmd, timeout=15)
-            
-            if result.stdout.strip():
-                return json.loads(result.stdout.strip())
-            else:
-                return {'additions': 0, 'deletions': 0, 'total': 0}
+            commit_data = self._get_json(self._build_path("get_commit", repo=repo, sha=full_sha), timeout=15)
+            stats = (commit_data or {}).get('stats') or {}
+            return {
+                'additions': stats.get('additions', 0),
+                'deletions': stats.get('deletions', 0),
+                'total': stats.get('total', 0)
+            }
                 
-        except (GitHubAPIError, json.JSONDecodeError) as e:
+        except (GitHubAPIError, json.JSONDecodeError, AttributeError) as e:
             logger.warning(f"Failed to get stats for {repo}/{sha}: {e}")
             return {'additions': 0, 'deletions': 0, 'total': 0}
     
+    def get_commit_stats_batch(self, repo: str, shas: List[str]) -> Dict[str, Dict[str, int]]:
+        """Get statistics for many commits of a repository via batched GraphQL queries"""
+        if not self.config.include_stats or not shas:
+            return {}
+        
+        stats_map = {}
+        batch_size = PERFORMANCE_SETTINGS["stats_batch_size"]
+        
+        for i in range(0, len(shas), batch_size):
+            batch = shas[i:i + batch_size]
+            
+            # One aliased object lookup per commit; rev-parse expressions accept short SHAs
+            selections = " ".join(
+                f"c{j}: object(expression: {json.dumps(sha)}) {{ ... on Commit {{ additions deletions }} }}"
+                for j, sha in enumerate(batch)
+            )
+            query = (f"query {{ repository(owner: {json.dumps(self.org)}, name: {json.dumps(repo)}) "
+                     f"{{ {selections} }} }}")
+            
+            try:
+                response = self._request("POST", GITHUB_API["graphql"], body=json_dumps({"query": query}))
+                repository = response.json()["data"]["repository"] or {}
+            except (GitHubAPIError, json.JSONDecodeError, KeyError, TypeError) as e:
+                logger.warning(f"Batched stats query failed for {repo}, falling back to per-commit requests: {e}")
+                for sha in batch:
+                    stats_map[sha] = self.get_commit_stats(repo, sha)
+                continue
+            
+            for j, sha in enumerate(batch):
+                node = repository.get(f"c{j}") or {}
+                additions = node.get('additions', 0)
+                deletions = node.get('deletions', 0)
+                stats_map[sha] = {'additions': additions, 'deletions': deletions, 'total': additions + deletions}
+        
+        return stats_map
+    
     def _get_full_sha(self, repo: str, short_sha: str) -> str:
         """Get full SHA from short SHA"""
         # For stats API, we can use the short SHA directly since GitHub accepts partial SHAs
@@ -180,106 +515,296 @@ class GitHubClient:
         if len(short_sha) >= 7:  # GitHub typically needs at least 7 characters
             return short_sha
         
+        cache_key = (repo, short_sha)
+        if cache_key in self._sha_cache:
+            return self._sha_cache[cache_key]
+        
         # Only try to expand if it's really short
-        cmd = [
-            "gh", "api", f"/repos/{self.org}/{repo}/commits",
-            "--jq", f".[] | select(.sha | startswith(\"{short_sha}\")) | .sha"
-        ]
+        path = self._build_path("get_commits", {"per_page": GITHUB_API["per_page"]}, repo=repo)
         
         try:
-            result = self._run_command(cmd, timeout=10)
-            if result.stdout.strip():
-                return result.stdout.strip().split('\n')[0]
-        except GitHubAPIError:
+            for item in self._get_json(path, timeout=10) or []:
+                if item['sha'].startswith(short_sha):
+                    self._sha_cache[cache_key] = item['sha']
+                    return item['sha']
+        except (GitHubAPIError, json.JSONDecodeError, KeyError, TypeError):
             pass
         
         return short_sha  # Return as-is rather than padding with invalid zeros
     
-    def get_commits_for_repo(self, repo: str) -> List[Dict]:
+    def get_commits_for_repo(self, repo: str) -> List[CommitRow]:
         """Get all commits for a repository (all branches if configured)"""
         try:
-            all_commits = []
-            commit_shas: Set[str] = set()
-            
             if self.config.include_all_branches:
                 branches = self.get_branches(repo)
             else:
                 branches = ["main"]  # Default to main branch only
             
-            for branch in branches:
-                branch_commits = self.get_commits_for_branch(repo, branch)
-                
-                # Deduplicate commits across branches
-                for commit in branch_commits:
-                    try:
-                        sha = commit['sha']
-                        if sha not in commit_shas:
-                            commit_shas.add(sha)
-                            
-                            # Add stats if requested
-                            if self.config.include_stats:
-                                logger.debug(f"Getting stats for {repo}/{sha}")
-                                stats = self.get_commit_stats(repo, sha)
-                                commit.update({
-                                    'additions': stats.get('additions', 0),
-                                    'deletions': stats.get('deletions', 0),
-                                    'total_changes': stats.get('total', 0)
-                                })
-                            
-                            all_commits.append(commit)
-                    except KeyError as e:
-                        logger.error(f"KeyError processing commit in {repo}: missing key {e}")
-                        logger.error(f"Commit data: {commit}")
-                        logger.error(f"Available keys: {list(commit.keys()) if isinstance(commit, dict) else 'not a dict'}")
-                        continue
-                    except Exception as e:
-                        logger.error(f"Error processing commit in {repo}: {e}")
-                        import traceback
-                        logger.error(traceback.format_exc())
-                        continue
-            
-            logger.info(f"✓ {repo}: {len(all_commits)} commits across {len(branches)} branches")
-            return all_commits
+            return self._finish_repo(repo, [self.get_commits_for_branch(repo, branch) for branch in branches])
             
         except Exception as e:
             logger.error(f"Error processing repository {repo}: {e}")
-            import traceback
             logger.debug(traceback.format_exc())
             return []
     
-    def collect_all_commits(self, repositories: Optional[List[str]] = None) -> List[Dict]:
+    def _finish_repo(self, repo: str, branch_commits: List[List[CommitRow]]) -> List[CommitRow]:
+        """Deduplicate a repository's per-branch commits and attach stats if requested"""
+        # Deduplicate commits across branches, keeping the first occurrence
+        unique_commits: Dict[str, CommitRow] = {}
+        add_commit = unique_commits.setdefault
+        for commit in chain.from_iterable(branch_commits):
+            add_commit(commit.sha, commit)
+        all_commits = list(unique_commits.values())
+        
+        # Add stats for each unique commit if requested, batched into as few queries as possible
+        if self.config.include_stats and all_commits:
+            logger.debug(f"Getting stats for {len(all_commits)} commits in {repo}")
+            stats_map = self.get_commit_stats_batch(repo, [c.sha for c in all_commits])
+            for commit in all_commits:
+                stats = stats_map.get(commit.sha, {})
+                commit.additions = stats.get('additions', 0)
+                commit.deletions = stats.get('deletions', 0)
+                commit.total_changes = stats.get('total', 0)
+        
+        logger.info(f"✓ {repo}: {len(all_commits)} commits across {len(branch_commits)} branches")
+        return all_commits
+    
+    def collect_all_commits(self, repositories: Optional[List[str]] = None) -> List[CommitRow]:
         """Collect commits from all repositories with parallel processing"""
+        return _sorted_commits(self.iter_commits(repositories))
+    
+    def iter_commits(self, repositories: Optional[List[str]] = None) -> Iterator[List[CommitRow]]:
+        """Yield each repository's commits as soon as that repository is finished"""
         if repositories is None:
             repositories = self.get_repositories()
         
-        all_commits = []
-        batch_size = self.config.batch_size
+        # Scheduler state is keyed by repository name, so each repository is collected once
+        repositories = list(dict.fromkeys(repositories))
+        total_repos = len(repositories)
+        progress_interval = max(1, self.config.batch_size)
+        completed = 0
         
-        logger.info(f"Processing {len(repositories)} repositories in batches of {batch_size}")
+        logger.info(f"Processing {total_repos} repositories with {self.config.max_workers} workers")
         
-        for i in range(0, len(repositories), batch_size):
-            batch = repositories[i:i + batch_size]
-            batch_num = i // batch_size + 1
-            total_batches = (len(repositories) + batch_size - 1) // batch_size
+        # Every request is its own task on a single pool: a repository's branches fan out
+        # across all workers instead of being fetched one after another inside one worker,
+        # and each worker thread reuses its keep-alive connection throughout
+        executor = ThreadPoolExecutor(max_workers=self.config.max_workers)
+        try:
+            pending: Dict[Future, Tuple[str, str, int]] = {}  # future -> (stage, repo, branch index)
+            branch_results: Dict[str, List[List[CommitRow]]] = {}
+            branches_left: Dict[str, int] = {}
             
-            logger.info(f"Processing batch {batch_num}/{total_batches}: {len(batch)} repos")
+            def schedule_branches(repo: str, branches: List[str]) -> None:
+                branch_results[repo] = [[] for _ in branches]
+                branches_left[repo] = len(branches)
+                for index, branch in enumerate(branches):
+                    pending[executor.submit(self.get_commits_for_branch, repo, branch)] = ("commits", repo, index)
+                if not branches:
+                    pending[executor.submit(self._finish_repo, repo, [])] = ("finish", repo, 0)
             
-            with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
-                future_to_repo = {
-                    executor.submit(self.get_commits_for_repo, repo): repo 
-                    for repo in batch
-                }
+            # Only a bounded window of repositories is in flight, so finished repositories are
+            # yielded early and an early exit leaves little queued work behind
+            waiting_repos = iter(repositories)
+            max_active = max(PERFORMANCE_SETTINGS["max_concurrent_repos"], self.config.max_workers)
+            active = 0
+            
+            def admit_repositories() -> None:
+                nonlocal active
+                for repo in waiting_repos:
+                    if self.config.include_all_branches:
+                        pending[executor.submit(self.get_branches, repo)] = ("branches", repo, 0)
+                    else:
+                        schedule_branches(repo, ["main"])  # Default to main branch only
+                    active += 1
+                    if active >= max_active:
+                        return
+            
+            admit_repositories()
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
                 
-                for future in as_completed(future_to_repo, timeout=120):
-                    repo = future_to_repo[future]
+                for future in done:
+                    stage, repo, index = pending.pop(future)
                     try:
-                        commits = future.result()
-                        all_commits.extend(commits)
+                        result = future.result()
                     except Exception as e:
                         logger.error(f"✗ {repo}: {e}")
+                        # A failed branch contributes nothing; a failed listing or final pass ends the repository
+                        result = [] if stage == "commits" else None
+                    
+                    if stage == "branches" and result is not None:
+                        schedule_branches(repo, result)
+                        continue
+                    
+                    if stage == "commits":
+                        branch_results[repo][index] = result
+                        branches_left[repo] -= 1
+                        if branches_left[repo] == 0:
+                            del branches_left[repo]
+                            finish = executor.submit(self._finish_repo, repo, branch_results.pop(repo))
+                            pending[finish] = ("finish", repo, 0)
+                        continue
+                    
+                    completed += 1
+                    active -= 1
+                    admit_repositories()
+                    if completed % progress_interval == 0 or completed == total_repos:
+                        logger.info(f"Processed {completed}/{total_repos} repositories")
+                    if result:
+                        yield result
+        finally:
+            # On an early exit (an error, Ctrl-C or a closed generator) drop the queued
+            # requests instead of waiting for the rest of the organization to download
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def collect_all_commits_mp(self, repositories: Optional[List[str]] = None,
+                               workers: Optional[int] = None) -> List[CommitRow]:
+        """Collect commits with repositories spread over worker processes, so parsing scales past the GIL"""
+        if repositories is None:
+            repositories = self.get_repositories()
+        
+        # Collect each repository once, as iter_commits does
+        repositories = list(dict.fromkeys(repositories))
+        batches: List[List[CommitRow]] = []
+        total_repos = len(repositories)
+        workers = workers or self.config.max_workers
+        progress_interval = max(1, self.config.batch_size)
+        
+        # Hand the resolved tokens to the workers so no process has to look them up again
+        config = replace(self.config, tokens=self._tokens.tokens)
+        # forkserver starts workers from a small clean process instead of forking this one
+        context = multiprocessing.get_context("forkserver") if sys.platform.startswith("linux") else None
+        
+        logger.info(f"Processing {total_repos} repositories with {workers} worker processes")
+        
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker_process,
+                                 initargs=(config, logging.getLogger().level)) as executor:
+            future_to_repo = {
+                executor.submit(_collect_repo_in_worker, repo): repo
+                for repo in repositories
+            }
+            
+            for completed, future in enumerate(as_completed(future_to_repo), 1):
+                repo = future_to_repo[future]
+                try:
+                    batches.append(future.result())
+                except Exception as e:
+                    logger.error(f"✗ {repo}: {e}")
+                
+                if completed % progress_interval == 0 or completed == total_repos:
+                    logger.info(f"Processed {completed}/{total_repos} repositories")
         
-        # Sort by timestamp (newest first)
-        all_commits.sort(key=lambda x: x['timestamp'], reverse=True)
+        return _sorted_commits(batches)
+    
+    def collect_all_commits_graphql(self, repositories: Optional[List[str]] = None) -> List[CommitRow]:
+        """Collect main branch commits using batched GraphQL history queries"""
+        return _sorted_commits(self.iter_commits_graphql(repositories))
+    
+    def iter_commits_graphql(self, repositories: Optional[List[str]] = None) -> Iterator[List[CommitRow]]:
+        """Yield the commits of each GraphQL batch of repositories as it finishes"""
+        if repositories is None:
+            repositories = self.get_repositories()
         
-        logger.info(f"Collected {len(all_commits)} total commits")
-        return all_commits
\ No newline at end of file
+        repos_per_query = PERFORMANCE_SETTINGS["graphql_repos_per_query"]
+        batches = [repositories[i:i + repos_per_query] for i in range(0, len(repositories), repos_per_query)]
+        
+        logger.info(f"Processing {len(repositories)} repositories in {len(batches)} GraphQL batches")
+        
+        executor = ThreadPoolExecutor(max_workers=self.config.max_workers)
+        try:
+            future_to_batch = {
+                executor.submit(self._collect_graphql_batch, batch): batch
+                for batch in batches
+            }
+            for future in as_completed(future_to_batch):
+                try:
+                    commits = future.result()
+                except Exception as e:
+                    # An unexpected payload shape loses this batch, not the whole run
+                    logger.error(f"✗ {', '.join(future_to_batch[future])}: {e}")
+                    continue
+                if commits:
+                    yield commits
+        finally:
+            # As in iter_commits: an early exit (e.g. a --stream write failure) drops the queued batches
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _collect_graphql_batch(self, repositories: List[str]) -> List[CommitRow]:
+        """Page through the main branch history of several repositories, one query per page"""
+        commits = []
+        variables = {"org": self.org, "since": self.config.since_date, "until": self.config.until_date}
+        
+        # Repositories that still have pages to fetch, mapped to their next cursor
+        cursors: Dict[str, Optional[str]] = dict.fromkeys(repositories)
+        
+        while cursors:
+            pending = list(cursors.items())
+            body = json_dumps({"query": self._build_history_query(pending), "variables": variables})
+            
+            try:
+                payload = self._request("POST", GITHUB_API["graphql"], body=body).json() or {}
+            except (GitHubAPIError, json.JSONDecodeError) as e:
+                logger.error(f"GraphQL collection failed for {', '.join(cursors)}: {e}")
+                break
+            
+            if payload.get("errors"):
+                logger.warning(f"GraphQL errors: {[error.get('message') for error in payload['errors']]}")
+            
+            data = payload.get("data") or {}
+            cursors = {}
+            
+            for i, (repo, _) in enumerate(pending):
+                target = (((data.get(f"r{i}") or {}).get("ref") or {}).get("target") or {})
+                history = target.get("history")
+                if history is None:
+                    logger.warning(f"Failed to get commits for {repo}:main via GraphQL")
+                    continue
+                
+                # GitActor.name is nullable; such commits are skipped like malformed REST entries
+                nodes = _valid_commit_fields(history.get("nodes") or [], _history_commit_fields)
+                commits.extend(self._build_commit_rows(nodes, repo, "main"))
+                
+                page_info = history["pageInfo"]
+                if page_info["hasNextPage"]:
+                    cursors[repo] = page_info["endCursor"]
+                else:
+                    logger.info(f"✓ {repo}: collected via GraphQL")
+        
+        return commits
+    
+    def _build_history_query(self, pending: List[Tuple[str, Optional[str]]]) -> str:
+        """Build one query selecting a history page for each (repo, cursor) as aliases r0..rN"""
+        stats_fields = " additions deletions" if self.config.include_stats else ""
+        selections = []
+        
+        for i, (repo, cursor) in enumerate(pending):
+            after = f", after: {json.dumps(cursor)}" if cursor else ""
+            selections.append(
+                f"r{i}: repository(owner: $org, name: {json.dumps(repo)}) {{ "
+                f"ref(qualifiedName: \"refs/heads/main\") {{ target {{ ... on Commit {{ "
+                f"history(since: $since, until: $until, first: {GITHUB_API['per_page']}{after}) {{ "
+                f"pageInfo {{ endCursor hasNextPage }} "
+                f"nodes {{ oid message authoredDate author {{ name }}{stats_fields} }} }} }} }} }} }}"
+            )
+        
+        return f"query($org: String!, $since: GitTimestamp, $until: GitTimestamp) {{ {' '.join(selections)} }}"
+
+# Client owned by a collect_all_commits_mp worker process
+_worker_client: Optional[GitHubClient] = None
+
+def _init_worker_process(config: CollectionConfig, log_level: int) -> None:
+    """Set up logging and a client in a freshly started worker process"""
+    global _worker_client
+    logging.basicConfig(
+        level=log_level,
+        format=OUTPUT_FORMATS["console"]["log_format"],
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    _worker_client = GitHubClient(config)
+
+def _collect_repo_in_worker(repo: str) -> List[CommitRow]:
+    """Collect one repository in a worker process"""
+    return _worker_client.get_commits_for_repo(repo)
+
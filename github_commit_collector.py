@@ -15,26 +15,27 @@ Example:
 import argparse
 import logging
 import sys
-from datetime import datetime
+import traceback
 from typing import Optional
 
-from config import CollectionConfig, get_default_output_filename, validate_github_cli
+from config import (CollectionConfig, CACHE_SETTINGS, OUTPUT_FORMATS, get_default_output_filename,
+                    parse_iso_datetime, read_tokens_file, validate_github_cli)
 from github_client import GitHubClient, GitHubAPIError
-from data_processor import DataProcessor
+from data_processor import DataProcessor, parquet_available, write_console
 
 def setup_logging(verbose: bool = False) -> None:
     """Setup logging configuration"""
     level = logging.DEBUG if verbose else logging.INFO
     logging.basicConfig(
         level=level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        format=OUTPUT_FORMATS["console"]["log_format"],
         handlers=[
             logging.StreamHandler(sys.stdout)
         ]
     )
 
-def parse_arguments() -> argparse.Namespace:
-    """Parse command line arguments"""
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the command line argument parser"""
     parser = argparse.ArgumentParser(
         description="Collect GitHub commit messages for an organization",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -61,6 +62,9 @@ Examples:
   # Custom output filename
   python github_commit_collector.py seekrtech --output my_commits.csv
 
+  # Batched GraphQL collection (main branch, many repositories per request)
+  python github_commit_collector.py seekrtech --use-graphql
+
   # Verbose output for debugging
   python github_commit_collector.py seekrtech --verbose
         """
@@ -89,7 +93,14 @@ Examples:
     
     parser.add_argument(
         '--output', '-o',
-        help='Output CSV filename (auto-generated if not specified)'
+        help='Output filename (auto-generated if not specified)'
+    )
+    
+    parser.add_argument(
+        '--format',
+        choices=['csv', 'parquet'],
+        default='csv',
+        help='Output file format; parquet requires pyarrow (default: csv)'
     )
     
     parser.add_argument(
@@ -113,8 +124,8 @@ Examples:
     parser.add_argument(
         '--batch-size',
         type=int,
-        default=10,
-        help='Number of repositories to process in parallel (default: 10)'
+        help='Deprecated: no longer limits concurrency (use --max-workers); '
+             'only sets the completed repositories between progress updates (default: 10)'
     )
     
     parser.add_argument(
@@ -124,6 +135,13 @@ Examples:
         help='Maximum number of concurrent workers (default: 5)'
     )
     
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=0,
+        help='With --stats, spread repositories over this many worker processes (default: 0, threads only)'
+    )
+    
     parser.add_argument(
         '--timeout',
         type=int,
@@ -143,12 +161,49 @@ Examples:
         help='Specific repositories to process (default: all repos in organization)'
     )
     
-    return parser.parse_args()
+    parser.add_argument(
+        '--cache-dir',
+        default=CACHE_SETTINGS["directory"],
+        help=f'Directory for the conditional request cache (default: {CACHE_SETTINGS["directory"]})'
+    )
+    
+    parser.add_argument(
+        '--skip-auth-check',
+        action='store_true',
+        help='Skip the upfront GitHub authentication check'
+    )
+    
+    parser.add_argument(
+        '--tokens-file',
+        help='File with one GitHub token per line, rotated per request to raise the rate limit'
+    )
+    
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Write commits to the CSV as each repository finishes instead of holding them all in memory '
+             '(rows are not sorted by date)'
+    )
+    
+    parser.add_argument(
+        '--use-graphql',
+        action='store_true',
+        help='Collect main branch commits with batched GraphQL queries (many repositories per request)'
+    )
+    
+    return parser
+
+# Built once at import and reused by every parse_arguments() call
+_PARSER = _build_parser()
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments"""
+    return _PARSER.parse_args()
 
 def validate_date_format(date_string: str) -> bool:
     """Validate ISO date format"""
     try:
-        datetime.fromisoformat(date_string.replace('Z', '+00:00'))
+        parse_iso_datetime(date_string)
         return True
     except ValueError:
         return False
@@ -161,22 +216,57 @@ def main() -> int:
     setup_logging(args.verbose)
     logger = logging.getLogger(__name__)
     
+    tokens = None
+    if args.tokens_file:
+        try:
+            tokens = read_tokens_file(args.tokens_file)
+        except OSError as e:
+            write_console([f"❌ Error: Could not read --tokens-file: {e}"])
+            return 1
+        if not tokens:
+            write_console([f"❌ Error: No tokens found in {args.tokens_file}"])
+            return 1
+    
     # Validate GitHub CLI
-    if not validate_github_cli():
-        print("❌ Error: GitHub CLI (gh) is not installed or not authenticated.")
-        print("Please install GitHub CLI and run 'gh auth login' first.")
-        print("Visit: https://cli.github.com/")
+    if not tokens and not args.skip_auth_check and not validate_github_cli():
+        write_console([
+            "❌ Error: GitHub CLI (gh) is not installed or not authenticated, and GH_TOKEN is not set.",
+            "Please install GitHub CLI and run 'gh auth login' first, or export GH_TOKEN.",
+            "Visit: https://cli.github.com/"
+        ])
         return 1
     
     # Validate date formats
     if not validate_date_format(args.since):
-        print(f"❌ Error: Invalid --since date format: {args.since}")
-        print("Use ISO format like: 2025-01-01T00:00:00Z")
+        write_console([f"❌ Error: Invalid --since date format: {args.since}", "Use ISO format like: 2025-01-01T00:00:00Z"])
         return 1
     
     if args.until and not validate_date_format(args.until):
-        print(f"❌ Error: Invalid --until date format: {args.until}")
-        print("Use ISO format like: 2025-12-31T23:59:59Z")
+        write_console([f"❌ Error: Invalid --until date format: {args.until}", "Use ISO format like: 2025-12-31T23:59:59Z"])
+        return 1
+    
+    if args.batch_size is not None:
+        write_console(["⚠️ Warning: --batch-size is deprecated and no longer controls how many repositories "
+                       "are processed in parallel; use --max-workers instead"])
+    
+    if args.format == 'parquet' and args.stream:
+        write_console(["❌ Error: --stream writes CSV only and cannot be combined with --format parquet"])
+        return 1
+    
+    if args.format == 'parquet' and not parquet_available():
+        write_console(["❌ Error: --format parquet requires pyarrow. Install it with: pip install pyarrow"])
+        return 1
+    
+    if args.processes > 0:
+        if not args.stats:
+            write_console(["❌ Error: --processes only applies to --stats collection; add --stats or drop --processes"])
+            return 1
+        if args.stream or args.use_graphql:
+            write_console(["❌ Error: --processes cannot be combined with --stream or --use-graphql"])
+            return 1
+    
+    if args.use_graphql and args.all_branches:
+        write_console(["❌ Error: --use-graphql collects the main branch only and cannot be combined with --all-branches"])
         return 1
     
     try:
@@ -190,78 +280,112 @@ def main() -> int:
             author_filter=args.author,
             exclude_merge_commits=args.no_merge,
             max_workers=args.max_workers,
-            batch_size=args.batch_size,
-            timeout_seconds=args.timeout
+            batch_size=args.batch_size if args.batch_size is not None else CollectionConfig.batch_size,
+            timeout_seconds=args.timeout,
+            cache_dir=args.cache_dir,
+            tokens=tokens
         )
         
         # Initialize clients
         github_client = GitHubClient(config)
         data_processor = DataProcessor()
         
-        print(f"🚀 Starting commit collection for organization: {args.organization}")
-        print(f"📅 Date range: {args.since}" + (f" to {args.until}" if args.until else " to present"))
+        banner = [
+            f"🚀 Starting commit collection for organization: {args.organization}",
+            f"📅 Date range: {args.since}" + (f" to {args.until}" if args.until else " to present")
+        ]
         
         if args.author:
-            print(f"👤 Filtering by author: {args.author}")
+            banner.append(f"👤 Filtering by author: {args.author}")
         if args.stats:
-            print("📊 Including detailed statistics (this will take longer)")
+            banner.append("📊 Including detailed statistics (this will take longer)")
         if args.all_branches:
-            print("🌿 Collecting from all branches")
+            banner.append("🌿 Collecting from all branches")
         if args.no_merge:
-            print("🚫 Excluding merge commits")
+            banner.append("🚫 Excluding merge commits")
+        if args.use_graphql:
+            banner.append("🔗 Using batched GraphQL collection")
         
-        print()
+        banner.append("")
         
         # Collect commits
         if args.repos:
-            print(f"📂 Processing specific repositories: {', '.join(args.repos)}")
-            commits = github_client.collect_all_commits(args.repos)
-        else:
-            commits = github_client.collect_all_commits()
-        
-        if not commits:
-            print("⚠️ No commits found matching the criteria")
-            return 0
+            banner.append(f"📂 Processing specific repositories: {', '.join(args.repos)}")
         
-        # Apply filters
-        if args.author:
-            commits = data_processor.filter_by_author(commits, args.author)
-            if not commits:
-                print(f"⚠️ No commits found for author pattern: {args.author}")
-                return 0
-        
-        if args.no_merge:
-            commits = data_processor.exclude_merge_commits(commits)
+        write_console(banner)
         
         # Generate output filename if not provided
-        output_filename = args.output or get_default_output_filename(args.organization, config)
+        output_filename = args.output or get_default_output_filename(args.organization, config, args.format)
         
-        # Save to CSV
-        data_processor.save_to_csv(
-            commits, 
-            output_filename,
-            include_branches=config.include_all_branches,
-            include_stats=config.include_stats
-        )
+        if args.stream:
+            # Filter, write and summarize each repository's commits as they arrive
+            if args.use_graphql:
+                batches = github_client.iter_commits_graphql(args.repos)
+            else:
+                batches = github_client.iter_commits(args.repos)
+            
+            accumulator = data_processor.stream_to_csv(
+                batches,
+                output_filename,
+                include_branches=config.include_all_branches,
+                include_stats=config.include_stats,
+                author_pattern=args.author,
+                exclude_merges=args.no_merge
+            )
+            
+            if not accumulator.total_commits:
+                write_console(["⚠️ No commits found matching the criteria"])
+                return 0
+            
+            total_commits = accumulator.total_commits
+            stats = accumulator.result()
+            largest_commits = accumulator.largest_commits[:5]
+        else:
+            if args.use_graphql:
+                commits = github_client.collect_all_commits_graphql(args.repos)
+            elif args.processes > 0:
+                commits = github_client.collect_all_commits_mp(args.repos, workers=args.processes)
+            else:
+                commits = github_client.collect_all_commits(args.repos)
+            
+            if not commits:
+                write_console(["⚠️ No commits found matching the criteria"])
+                return 0
+            
+            # Apply filters
+            commits = data_processor.filter_commits(commits, author=args.author, exclude_merge=args.no_merge)
+            if not commits:
+                write_console([f"⚠️ No commits found for author pattern: {args.author}" if args.author
+                               else "⚠️ No commits found matching the criteria"])
+                return 0
+            
+            # Save in the requested format
+            save = data_processor.save_to_parquet if args.format == 'parquet' else data_processor.save_to_csv
+            save(
+                commits, 
+                output_filename,
+                include_branches=config.include_all_branches,
+                include_stats=config.include_stats
+            )
+            
+            total_commits = len(commits)
+            stats = data_processor.generate_statistics(commits, include_stats=config.include_stats)
+            largest_commits = data_processor.find_largest_commits(commits, limit=5) if config.include_stats else []
         
-        # Generate and display statistics
-        stats = data_processor.generate_statistics(commits)
-        data_processor.print_statistics(stats)
+        # Display statistics, largest commits (if stats are available) and the summary in one write
+        report = data_processor.format_statistics(stats)
         
-        # Show largest commits if stats are available
-        if config.include_stats:
-            largest_commits = data_processor.find_largest_commits(commits, limit=5)
-            if largest_commits:
-                print(f"\n🔝 Largest commits by lines changed:")
-                for i, commit in enumerate(largest_commits, 1):
-                    additions = commit.get('additions', 0)
-                    deletions = commit.get('deletions', 0)
-                    total = commit.get('total_changes', 0)
-                    message = commit['message'][:60] + "..." if len(commit['message']) > 60 else commit['message']
-                    print(f"   {i}. {commit['repository']}: +{additions}/-{deletions} (total: {total}) - {message}")
+        if largest_commits:
+            report.append(f"\n🔝 Largest commits by lines changed:")
+            report.extend(
+                f"   {i}. {commit.repository}: +{commit.additions}/-{commit.deletions} "
+                f"(total: {commit.total_changes}) - {commit.message:.60}{'...' if len(commit.message) > 60 else ''}"
+                for i, commit in enumerate(largest_commits, 1)
+            )
         
-        print(f"\n✅ Successfully collected {len(commits)} commits")
-        print(f"📄 Results saved to: {output_filename}")
+        report.append(f"\n✅ Successfully collected {total_commits} commits")
+        report.append(f"📄 Results saved to: {output_filename}")
+        write_console(report)
         
         return 0
         
@@ -271,7 +395,6 @@ def main() -> int:
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         if args.verbose:
-            import traceback
             traceback.print_exc()
         return 1
 
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Data models for collected commit information
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+@dataclass(slots=True)
+class CommitRow:
+    """A single collected commit; stats fields stay 0 unless stats were requested"""
+    timestamp: str
+    repository: str
+    branch: Optional[str]
+    message: str
+    author: str
+    sha: str
+    additions: int = 0
+    deletions: int = 0
+    total_changes: int = 0
+
+    @classmethod
+    def from_csv_row(cls, row: Dict[str, str]) -> "CommitRow":
+        """Build a commit from a CSV row written by DataProcessor.save_to_csv"""
+        return cls(
+            timestamp=row['timestamp'],
+            repository=row['repository'],
+            branch=row.get('branch') or None,
+            message=row['message'],
+            author=row['author'],
+            sha=row['sha'],
+            additions=int(row.get('additions') or 0),
+            deletions=int(row.get('deletions') or 0),
+            total_changes=int(row.get('total_changes') or 0)
+        )
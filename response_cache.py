@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of GitHub API responses for conditional requests
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CachedResponse:
+    """Validators and payload of a previously fetched API response"""
+    etag: Optional[str]
+    last_modified: Optional[str]
+    link: Optional[str]
+    body: bytes
+
+class ResponseCache:
+    """SQLite store mapping request paths to their last validators and response body
+
+    Entries stored more than max_age seconds ago are dropped when the cache is opened.
+    """
+
+    def __init__(self, path: str, max_age: Optional[float] = None):
+        # Cached bodies include private repository commits, so only the owner may read them
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+        os.chmod(path, 0o600)  # Also tightens caches created before this was enforced
+
+        # Shared by all worker threads; writes are serialized with a lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "path TEXT PRIMARY KEY, etag TEXT, link TEXT, body BLOB NOT NULL, last_modified TEXT, "
+                "stored_at REAL)"
+            )
+
+            # Caches created before Last-Modified support or expiry lack those columns
+            columns = {row[1] for row in self._connection.execute("PRAGMA table_info(responses)")}
+            if "last_modified" not in columns:
+                self._connection.execute("ALTER TABLE responses ADD COLUMN last_modified TEXT")
+            if "stored_at" not in columns:
+                self._connection.execute("ALTER TABLE responses ADD COLUMN stored_at REAL")
+
+            # Every since/until query is its own path, so old entries would otherwise pile up forever
+            if max_age is not None:
+                expired = self._connection.execute(
+                    "DELETE FROM responses WHERE stored_at IS NULL OR stored_at < ?", (time.time() - max_age,)
+                ).rowcount
+                if expired:
+                    logger.debug(f"Dropped {expired} expired cached responses")
+
+    def get(self, path: str) -> Optional[CachedResponse]:
+        """Get the cached response for a request path"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT etag, last_modified, link, body FROM responses WHERE path = ?", (path,)
+            ).fetchone()
+        return CachedResponse(*row) if row else None
+
+    def put(self, path: str, etag: Optional[str], last_modified: Optional[str],
+            link: Optional[str], body: bytes) -> None:
+        """Store the latest response for a request path"""
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO responses (path, etag, last_modified, link, body, stored_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, etag, last_modified, link, body, time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to cache response for {path}: {e}")
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        with self._lock:
+            self._connection.close()
+
+def open_response_cache(path: str, max_age: Optional[float] = None) -> Optional[ResponseCache]:
+    """Open the response cache, or return None if it cannot be used"""
+    try:
+        return ResponseCache(path, max_age)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Response cache disabled, could not open {path}: {e}")
+        return None